@@ -8,6 +8,38 @@ X = "X"
 O = "O"
 EMPTY = None
 
+# Transposition table flags: whether a stored score is exact or only a bound
+EXACT = "EXACT"
+LOWERBOUND = "LOWERBOUND"
+UPPERBOUND = "UPPERBOUND"
+
+# Internally a board is a pair of 9-bit masks, one per player, where cell
+# (i, j) is bit i * 3 + j. Tables are keyed by the pair packed into a single
+# int, x_mask | o_mask << 9, which is unique per board and cheap to hash
+FULL = 0b111111111
+LINES = [0b000000111, 0b000111000, 0b111000000,   # rows
+         0b001001001, 0b010010010, 0b100100100,   # columns
+         0b100010001, 0b001010100]                # diagonals
+
+# Move ordering for the search: center, then corners, then edges, so the
+# strongest replies are tried first and alpha-beta cuts off sooner
+ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+ORDER_BITS = [1 << (i * 3 + j) for i, j in ORDER]
+
+# The eight symmetries of the board (four rotations, four reflections) as maps
+# from a cell to its image, and the index of each one's inverse
+SYMMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j),
+    lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j),
+    lambda i, j: (2 - i, j),
+    lambda i, j: (j, i),
+    lambda i, j: (2 - j, 2 - i),
+]
+INVERSES = [0, 3, 2, 1, 4, 5, 6, 7]
+
 
 def initial_state():
     """
@@ -22,157 +54,309 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    if all(cell == EMPTY for row in board for cell in row):
-        return X
-    
-    X_count = sum(row.count("X") for row in board)
-    O_count = sum(row.count("O") for row in board)
-
-    if X_count > O_count:
-        return O
-    else:
-        return X
-    
-    raise NotImplementedError
+    x_mask, o_mask = to_masks(board)
+    return mask_player(x_mask, o_mask)
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    actiones = set()
-    
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            if board[i][j] == EMPTY:
-                actiones.add((i, j))
-
-    return actiones
-
-    raise NotImplementedError
+    x_mask, o_mask = to_masks(board)
+    return {to_action(bit) for bit in bits(~(x_mask | o_mask) & FULL)}
 
 
-def result(board, action):
+def result(board, action, current_player=None):
     """
     Returns the board that results from making move (i, j) on the board.
+
+    The player making the move may be passed in when the caller already
+    knows it, saving a scan of the board to work it out.
     """
     if action not in actions(board):
         raise ValueError("Invalid move: Action is not possible")
     
+    if current_player is None:
+        current_player = player(board)
+
+    # Copy first and place the move on the copy, leaving the caller's board as
+    # it was
     i, j = action
-    if player(board) == X:
-        board[i][j] = X
-    else:
-        board[i][j] = O
+    new_board = copy_board(board)
+    new_board[i][j] = current_player
 
-    return copy_board(board)  # Return a new board, not the mutated one
+    return new_board
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    for i in range(len(board)):
-
-        # check the row 
-        if all(element == X for element in board[i]):
-            return X
-        elif all(element == O for element in board[i]):
-            return O
-
-        # check the column
-        if all(element == X for element in [row[i] for row in board]):
-            return X
-        elif all(element == O for element in [row[i] for row in board]):
-            return O
-        
-    # check the main Diameter
-    if all(element == X for element in [board[i][i] for i in range(len(board))]):
-        return X
-    elif all(element == O for element in [board[i][i] for i in range(len(board))]):
-        return O
-        
-    # check the anti Diameter
-    if all(element == X for element in [board[i][len(board)-i-1] for i in range(len(board))]):
-        return X
-    elif all(element == O for element in [board[i][len(board)-i-1] for i in range(len(board))]):
-        return O
-    
-    return None
-
-    raise NotImplementedError
+    x_mask, o_mask = to_masks(board)
+    return mask_winner(x_mask, o_mask)
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if len(actions(board)) == 0 or winner(board) == X or winner(board) == O:
-        return True
-    else:
-        return False
-    
-    raise NotImplementedError
+    x_mask, o_mask = to_masks(board)
+    is_terminal, _ = evaluate(x_mask, o_mask)
+    return is_terminal
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    result = winner(board)
-
-    if result == X:
-        return 1
-    elif result == O:
-        return -1
-    else:
-        return 0
-    
-    raise NotImplementedError
+    x_mask, o_mask = to_masks(board)
+    _, score = evaluate(x_mask, o_mask)
+    return score
 
 
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
-    def max_value(board):
-        if terminal(board):
-            return utility(board), None
+    x_mask, o_mask = to_masks(board)
+    is_terminal, _ = evaluate(x_mask, o_mask)
+    if is_terminal:
+        return None
+
+    key, symmetry = canonical(x_mask, o_mask)
+    if key not in POLICY:
+        # Not reachable from the initial state, so search it directly
+        return search(x_mask, o_mask, {})
+
+    return transform(POLICY[key], INVERSES[symmetry])
+
+
+def search(x_mask, o_mask, tt):
+    """
+    Returns the optimal action for the player to move on a non-terminal
+    bitmask board, using alpha-beta search memoized in the transposition
+    table tt, which maps a canonical packed key to (flag, score, best_action)
+    with best_action in the canonical orientation.
+    """
+    def probe(key, alpha, beta):
+        entry = tt.get(key)
+        if entry is None:
+            return None, alpha, beta
+        flag, score, best_action = entry
+        if flag == EXACT:
+            return entry, alpha, beta
+        if flag == LOWERBOUND:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        if alpha >= beta:
+            return entry, alpha, beta
+        return None, alpha, beta
+
+    def store(key, symmetry, score, best_action, alpha, beta):
+        if score <= alpha:
+            flag = UPPERBOUND
+        elif score >= beta:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        tt[key] = (flag, score, transform(best_action, symmetry))
+
+    def max_value(x_mask, o_mask, alpha, beta):
+        is_terminal, score = evaluate(x_mask, o_mask)
+        if is_terminal:
+            return score, None
+        key, symmetry = canonical(x_mask, o_mask)
+        entry, alpha, beta = probe(key, alpha, beta)
+        if entry is not None:
+            return entry[1], transform(entry[2], INVERSES[symmetry])
+        alpha_orig = alpha
         score = -math.inf
         best_action = None
-        for action in actions(board):
-            value, _ = min_value(result(copy_board(board), action))
+        empty_mask = ~(x_mask | o_mask) & FULL
+        for bit in ORDER_BITS:
+            if not empty_mask & bit:
+                continue
+            value, _ = min_value(x_mask | bit, o_mask, alpha, beta)
             if value > score:
                 score = value
-                best_action = action
+                best_action = to_action(bit)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        store(key, symmetry, score, best_action, alpha_orig, beta)
         return score, best_action
 
-    def min_value(board):
-        if terminal(board):
-            return utility(board), None
+    def min_value(x_mask, o_mask, alpha, beta):
+        is_terminal, score = evaluate(x_mask, o_mask)
+        if is_terminal:
+            return score, None
+        key, symmetry = canonical(x_mask, o_mask)
+        entry, alpha, beta = probe(key, alpha, beta)
+        if entry is not None:
+            return entry[1], transform(entry[2], INVERSES[symmetry])
+        beta_orig = beta
         score = math.inf
         best_action = None
-        for action in actions(board):
-            value, _ = max_value(result(copy_board(board), action))
+        empty_mask = ~(x_mask | o_mask) & FULL
+        for bit in ORDER_BITS:
+            if not empty_mask & bit:
+                continue
+            value, _ = max_value(x_mask, o_mask | bit, alpha, beta)
             if value < score:
                 score = value
-                best_action = action
+                best_action = to_action(bit)
+            beta = min(beta, score)
+            if alpha >= beta:
+                break
+        store(key, symmetry, score, best_action, alpha, beta_orig)
         return score, best_action
 
-    current_player = player(board)
-    if terminal(board):
-        return None
+    # A bound left for the root by an earlier search would narrow its window,
+    # and the move chosen within a narrowed window need not be optimal
+    tt.pop(canonical(x_mask, o_mask)[0], None)
 
-    if current_player == X:
-        _, best_action = max_value(board)
+    if mask_player(x_mask, o_mask) == X:
+        _, best_action = max_value(x_mask, o_mask, -math.inf, math.inf)
     else:
-        _, best_action = min_value(board)
+        _, best_action = min_value(x_mask, o_mask, -math.inf, math.inf)
 
     return best_action
 
 
+def solve():
+    """
+    Returns the optimal action for every non-terminal board reachable from
+    the initial state, keyed by canonical packed key and given in that
+    canonical orientation.
+    """
+    policy = {}
+    tt = {}
+    frontier = [canonical(*to_masks(initial_state()))[0]]
+    while frontier:
+        key = frontier.pop()
+        if key in policy:
+            continue
+        x_mask, o_mask = key & FULL, key >> 9
+        is_terminal, _ = evaluate(x_mask, o_mask)
+        if is_terminal:
+            continue
+        policy[key] = search(x_mask, o_mask, tt)
+
+        empty_mask = ~(x_mask | o_mask) & FULL
+        if mask_player(x_mask, o_mask) == X:
+            children = ((x_mask | bit, o_mask) for bit in bits(empty_mask))
+        else:
+            children = ((x_mask, o_mask | bit) for bit in bits(empty_mask))
+        frontier.extend(canonical(*child)[0] for child in children)
+    return policy
+
+
 def copy_board(board):
     """
     Returns a copy of the board to avoid mutating the original board.
     """
     return [row.copy() for row in board]
+
+
+def to_masks(board):
+    """
+    Returns the (x_mask, o_mask) bitmask pair for the board.
+    """
+    x_mask = o_mask = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x_mask |= 1 << (i * 3 + j)
+            elif cell == O:
+                o_mask |= 1 << (i * 3 + j)
+    return x_mask, o_mask
+
+
+def to_action(bit):
+    """
+    Returns the action (i, j) for a single-bit cell mask.
+    """
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def bits(mask):
+    """
+    Yields each set bit of the mask as a single-bit mask.
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def mask_player(x_mask, o_mask):
+    """
+    Returns player who has the next turn on a bitmask board: X unless X has
+    made more moves than O.
+    """
+    return X if x_mask.bit_count() <= o_mask.bit_count() else O
+
+
+def mask_winner(x_mask, o_mask):
+    """
+    Returns the winner of a bitmask board, if there is one.
+    """
+    for line in LINES:
+        if x_mask & line == line:
+            return X
+        if o_mask & line == line:
+            return O
+    return None
+
+
+def evaluate(x_mask, o_mask):
+    """
+    Returns (is_terminal, utility) for a bitmask board in a single pass
+    over the winning lines.
+    """
+    for line in LINES:
+        if x_mask & line == line:
+            return True, 1
+        if o_mask & line == line:
+            return True, -1
+    return (x_mask | o_mask) == FULL, 0
+
+
+def symmetry_table(symmetry):
+    """
+    Returns a list mapping every 9-bit mask to its image under the symmetry.
+    """
+    table = []
+    for mask in range(FULL + 1):
+        image = 0
+        for bit in bits(mask):
+            i, j = symmetry(*to_action(bit))
+            image |= 1 << (i * 3 + j)
+        table.append(image)
+    return table
+
+
+def canonical(x_mask, o_mask):
+    """
+    Returns the smallest packed key of the bitmask board over all of its
+    symmetries, along with the index of the symmetry that produces it.
+    """
+    return min((table[x_mask] | table[o_mask] << 9, symmetry)
+               for symmetry, table in enumerate(SYMMETRY_TABLES))
+
+
+def transform(action, symmetry):
+    """
+    Returns the image of action (i, j) under the symmetry with that index.
+    """
+    i, j = action
+    return to_action(SYMMETRY_TABLES[symmetry][1 << (i * 3 + j)])
+
+
+# SYMMETRY_TABLES[s][mask] is the image of mask under symmetry s
+SYMMETRY_TABLES = [symmetry_table(symmetry) for symmetry in SYMMETRIES]
+
+# Optimal action for every reachable board up to symmetry, computed once at
+# import
+POLICY = solve()
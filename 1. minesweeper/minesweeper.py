@@ -1,5 +1,7 @@
 import itertools
+import math
 import random
+from collections import defaultdict
 
 
 class Minesweeper():
@@ -23,6 +25,15 @@ class Minesweeper():
                 self.mines.add((i, j))
                 self.board[i][j] = True
 
+        # Number of mines around each cell, counted up front since the mines
+        # never move, by adding each mine to the cells surrounding it
+        self.counts = [[0] * width for _ in range(height)]
+        for i, j in self.mines:
+            for ni in range(max(i - 1, 0), min(i + 2, height)):
+                for nj in range(max(j - 1, 0), min(j + 2, width)):
+                    if (ni, nj) != (i, j):
+                        self.counts[ni][nj] += 1
+
         self.mines_found = set()
 
     def print(self):
@@ -48,14 +59,8 @@ class Minesweeper():
         Returns the number of mines that are within one row and column of a given cell,
         not including the cell itself.
         """
-        count = 0
-        for i, j in itertools.product(range(cell[0] - 1, cell[0] + 2), range(cell[1] - 1, cell[1] + 2)):
-            if (i, j) == cell:
-                continue
-            if 0 <= i < self.height and 0 <= j < self.width:
-                if self.board[i][j]:
-                    count += 1
-        return count
+        i, j = cell
+        return self.counts[i][j]
 
     def won(self):
         """
@@ -69,24 +74,64 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    The cells are stored as an integer bitmask, so subset tests and
+    differences between sentences are single integer operations. Given the
+    board width, cell (i, j) is bit i * width + j; without it, cells are
+    numbered by the Cantor pairing of (i, j), which fits any board size.
+    Sentences built with different widths never compare equal.
+
+    `cells` is derived from the mask: reading it gives a frozenset, so it
+    cannot be changed in place by mistake, and assigning a new collection
+    of cells to it rebuilds the mask.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    def __init__(self, cells, count, width=None):
+        self.width = width
+        self.cells = cells
         self.count = count
 
+    @classmethod
+    def from_mask(cls, mask, count, width=None):
+        """
+        Returns a sentence over the cells set in the bitmask.
+        """
+        sentence = cls((), count, width)
+        sentence.mask = mask
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        Returns the cells in the sentence as a frozenset.
+        """
+        return frozenset(bit_cell(bit, self.width) for bit in bits(self.mask))
+
+    @cells.setter
+    def cells(self, cells):
+        self.mask = 0
+        for cell in cells:
+            self.mask |= cell_bit(cell, self.width)
+
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return (self.mask == other.mask and self.count == other.count
+                and self.width == other.width)
+
+    def __hash__(self):
+        return hash((self.mask, self.count))
+
+    def __len__(self):
+        return self.mask.bit_count()
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
 
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        if len(self.cells) == self.count:
-            return self.cells.copy()
+        if len(self) == self.count:
+            return set(self.cells)
         return set()
 
     def known_safes(self):
@@ -94,7 +139,7 @@ class Sentence():
         Returns the set of all cells in self.cells known to be safe.
         """
         if self.count == 0:
-            return self.cells.copy()
+            return set(self.cells)
         return set()
 
     def mark_mine(self, cell):
@@ -102,8 +147,9 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        bit = cell_bit(cell, self.width)
+        if self.mask & bit:
+            self.mask ^= bit
             self.count -= 1
 
     def mark_safe(self, cell):
@@ -111,8 +157,9 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        bit = cell_bit(cell, self.width)
+        if self.mask & bit:
+            self.mask ^= bit
             
 
 class MinesweeperAI():
@@ -128,14 +175,36 @@ class MinesweeperAI():
         self.safes = set()
         self.knowledge = []
 
+        # The non-empty sentences in self.knowledge, for constant time
+        # membership tests
+        self.knowledge_set = set()
+
+        # Maps each cell's bit to the sentences containing it, keyed by id()
+        # since a sentence's hash changes as its cells are marked
+        self.cell_index = defaultdict(dict)
+
+        # Sentences added or changed since inference last ran, keyed by id()
+        self.pending = {}
+
+        # Every cell on the board, built once for make_random_move
+        self.all_cells = frozenset(itertools.product(range(height), range(width)))
+
+        # Cells adjacent to each cell, not including the cell itself
+        self.neighbors = {
+            (i, j): frozenset(
+                neighbor for neighbor in itertools.product(range(i - 1, i + 2), range(j - 1, j + 2))
+                if 0 <= neighbor[0] < height and 0 <= neighbor[1] < width and neighbor != (i, j)
+            )
+            for i, j in self.all_cells
+        }
+
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.update_sentences(cell, Sentence.mark_mine)
 
     def mark_safe(self, cell):
         """
@@ -143,8 +212,51 @@ class MinesweeperAI():
         a cell is known to be safe.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.update_sentences(cell, Sentence.mark_safe)
+
+    def update_sentences(self, cell, mark):
+        """
+        Applies mark (Sentence.mark_mine or Sentence.mark_safe) for the cell to
+        every sentence containing it, rehashing each one in the knowledge set.
+        """
+        sentences = list(self.cell_index.pop(cell_bit(cell, self.width), {}).values())
+
+        # Take every affected sentence out of the set before changing any, so
+        # one that becomes equal to another cannot evict the other's entry
+        for sentence in sentences:
+            self.knowledge_set.discard(sentence)
+        for sentence in sentences:
+            mark(sentence, cell)
+            if not sentence.mask:
+                # Left out of the set; infer_knowledge prunes it from the list
+                continue
+            if sentence in self.knowledge_set:
+                # Now a duplicate of a known sentence, so only one is kept
+                self.drop_sentence(sentence)
+            else:
+                self.knowledge_set.add(sentence)
+                self.pending[id(sentence)] = sentence
+
+    def drop_sentence(self, sentence):
+        """
+        Removes a sentence that is not in the knowledge set from the cell
+        index, emptying it so infer_knowledge prunes it from the knowledge base.
+        """
+        for bit in bits(sentence.mask):
+            self.cell_index[bit].pop(id(sentence), None)
+        self.pending.pop(id(sentence), None)
+        sentence.mask = 0
+        sentence.count = 0
+
+    def add_sentence(self, sentence):
+        """
+        Appends a sentence to the knowledge base and indexes it by its cells.
+        """
+        self.knowledge.append(sentence)
+        self.knowledge_set.add(sentence)
+        self.pending[id(sentence)] = sentence
+        for bit in bits(sentence.mask):
+            self.cell_index[bit][id(sentence)] = sentence
 
     def add_knowledge(self, cell, count):
         """
@@ -163,9 +275,9 @@ class MinesweeperAI():
 
         # Add the new sentence to the knowledge base
         if unmarked_neighbors:
-            new_sentence = Sentence(unmarked_neighbors, adjusted_count)
-            if new_sentence not in self.knowledge:
-                self.knowledge.append(new_sentence)
+            new_sentence = Sentence(unmarked_neighbors, adjusted_count, self.width)
+            if new_sentence not in self.knowledge_set:
+                self.add_sentence(new_sentence)
 
         # Infer new knowledge
         self.infer_knowledge()
@@ -174,57 +286,60 @@ class MinesweeperAI():
         """
         Returns all neighbors of the given cell that are not marked as safe or mines.
         """
-        i, j = cell
-        neighbors = set(itertools.product(range(i - 1, i + 2), range(j - 1, j + 2)))
-        neighbors.discard(cell)
-        neighbors = {neighbor for neighbor in neighbors
-                     if 0 <= neighbor[0] < self.height and 0 <= neighbor[1] < self.width and neighbor not in self.moves_made and neighbor not in self.safes and neighbor not in self.mines}
-        return neighbors
+        return self.neighbors[cell] - self.moves_made - self.safes - self.mines
 
     def infer_knowledge(self):
         """
         Applies inference rules to update knowledge base and deduce new safe cells or mines.
+
+        Only sentences that were added or changed since the last inference are
+        examined, and marking a cell or adding a sentence queues up whatever it
+        touches, so the work done tracks what changed rather than the size of
+        the knowledge base.
         """
-        made_progress = True
-        while made_progress:
-            made_progress = False
-            safes_to_mark = set()
-            mines_to_mark = set()
+        while self.pending:
+            _, sentence = self.pending.popitem()
+            if not sentence.mask:
+                continue
 
-            for sentence in self.knowledge:
-                if len(sentence.cells) == 0:
+            if len(sentence) == sentence.count:
+                for bit in bits(sentence.mask):
+                    mine = bit_cell(bit, self.width)
+                    if mine not in self.mines:
+                        self.mark_mine(mine)
+                continue
+            if sentence.count == 0:
+                for bit in bits(sentence.mask):
+                    safe = bit_cell(bit, self.width)
+                    if safe not in self.safes:
+                        self.mark_safe(safe)
+                continue
+
+            # Combining sentences: subsets and supersets of this sentence all
+            # share at least one of its cells
+            related = {}
+            for bit in bits(sentence.mask):
+                related.update(self.cell_index[bit])
+            for other in related.values():
+                if other is sentence:
+                    continue
+                if sentence.mask & other.mask == sentence.mask:
+                    s1, s2 = sentence, other
+                elif sentence.mask & other.mask == other.mask:
+                    s1, s2 = other, sentence
+                else:
+                    continue
+                if s2.count <= s1.count:
                     continue
-                if len(sentence.cells) == sentence.count:
-                    mines_to_mark.update(sentence.cells)
-                elif sentence.count == 0:
-                    safes_to_mark.update(sentence.cells)
-
-            for safe in safes_to_mark:
-                if safe not in self.safes:
-                    self.mark_safe(safe)
-                    made_progress = True
-            for mine in mines_to_mark:
-                if mine not in self.mines:
-                    self.mark_mine(mine)
-                    made_progress = True
-
-            # Combining sentences
-            new_sentences = []
-            for s1, s2 in itertools.combinations(self.knowledge, 2):
-                if s1.cells.issubset(s2.cells) and s2.count > s1.count:
-                    new_cells = s2.cells - s1.cells
-                    new_count = s2.count - s1.count
-                    if new_cells:
-                        new_sentence = Sentence(new_cells, new_count)
-                        if new_sentence not in self.knowledge:
-                            new_sentences.append(new_sentence)
-                            made_progress = True
-
-            if new_sentences:
-                self.knowledge.extend(new_sentences)
-
-            # Remove empty sentences
-            self.knowledge = [sentence for sentence in self.knowledge if len(sentence.cells) > 0]
+                new_mask = s2.mask & ~s1.mask
+                new_count = s2.count - s1.count
+                if new_mask:
+                    new_sentence = Sentence.from_mask(new_mask, new_count, self.width)
+                    if new_sentence not in self.knowledge_set:
+                        self.add_sentence(new_sentence)
+
+        # Remove empty sentences
+        self.knowledge = [sentence for sentence in self.knowledge if sentence.mask]
 
     def make_safe_move(self):
         """
@@ -239,8 +354,42 @@ class MinesweeperAI():
         """
         Returns a random move that has not been made yet, if possible.
         """
-        all_moves = set(itertools.product(range(self.height), range(self.width)))
-        possible_moves = all_moves - self.moves_made - self.safes - self.mines
+        possible_moves = self.all_cells - self.moves_made - self.safes - self.mines
         if possible_moves:
             return random.choice(list(possible_moves))
         return None
+
+
+def cell_bit(cell, width=None):
+    """
+    Returns the single-bit mask for a cell, laid out by board width if given
+    and by the Cantor pairing of (i, j) otherwise.
+    """
+    i, j = cell
+    if i < 0 or j < 0 or (width is not None and j >= width):
+        raise ValueError(f"Cell {cell} is off the board")
+    if width is None:
+        return 1 << ((i + j) * (i + j + 1) // 2 + j)
+    return 1 << (i * width + j)
+
+
+def bit_cell(bit, width=None):
+    """
+    Returns the cell for a single-bit mask, inverting cell_bit.
+    """
+    index = bit.bit_length() - 1
+    if width is None:
+        diagonal = (math.isqrt(8 * index + 1) - 1) // 2
+        j = index - diagonal * (diagonal + 1) // 2
+        return diagonal - j, j
+    return divmod(index, width)
+
+
+def bits(mask):
+    """
+    Yields each set bit of the mask as a single-bit mask.
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit